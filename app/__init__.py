@@ -3,8 +3,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
 from config import Config
+from app.replica import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 login_manager = LoginManager()
 login_manager.login_view = 'login'
@@ -47,4 +48,10 @@ db.init_app(app)
 bcrypt.init_app(app)
 login_manager.init_app(app)
 
-from app import routes
+from app.punch import PunchBuffer
+punch_buffer = PunchBuffer(app)
+
+from app.report_cache import ReportCache
+report_cache = ReportCache(app)
+
+from app import routes, assets
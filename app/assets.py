@@ -0,0 +1,107 @@
+import gzip
+import hashlib
+import os
+
+from flask import request
+
+from app import app
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml',
+}
+ONE_YEAR = 365 * 24 * 60 * 60
+
+_static_hashes = {}
+
+
+def static_hash(filename):
+    """Short content hash of a file in the static folder, cached per mtime."""
+    path = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _static_hashes.get(filename)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    _static_hashes[filename] = (mtime, digest)
+    return digest
+
+
+@app.url_defaults
+def versioned_asset_urls(endpoint, values):
+    # url_for('static', ...) gets ?v=<content hash>, so a changed file gets a
+    # new URL and the old one can be cached forever.
+    if endpoint == 'static' and 'filename' in values:
+        digest = static_hash(values['filename'])
+        if digest:
+            values.setdefault('v', digest)
+
+
+@app.after_request
+def cache_static_assets(response):
+    if request.endpoint == 'static' and response.status_code in (200, 304):
+        filename = (request.view_args or {}).get('filename')
+        if filename and request.args.get('v') == static_hash(filename):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = ONE_YEAR
+            response.cache_control.immutable = True
+    return response
+
+
+def _accepted_encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+@app.after_request
+def compress_response(response):
+    if (response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    encoding = _accepted_encoding()
+    if encoding is None:
+        return response
+    if response.content_length is not None and response.content_length < app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    # Static files are sent as file wrappers; read them so they can be compressed.
+    response.direct_passthrough = False
+    data = response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    # send_file already checked If-None-Match against the uncompressed ETag,
+    # which the browser never has. Check again against the encoded one and
+    # skip compressing when it can get a 304.
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak=weak)
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+    if encoding == 'br':
+        data = brotli.compress(data, quality=app.config['COMPRESS_BROTLI_QUALITY'])
+    else:
+        data = gzip.compress(data, compresslevel=app.config['COMPRESS_GZIP_LEVEL'])
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
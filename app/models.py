@@ -1,4 +1,5 @@
 from datetime import datetime
+from flask import current_app
 from app import db, login_manager
 from flask_login import UserMixin
 
@@ -32,7 +33,7 @@ class Overtime(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False, default=datetime.utcnow)
     hours = db.Column(db.Float, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
 
     def __repr__(self):
         return f"Overtime('{self.date}', '{self.hours}')"
@@ -43,7 +44,33 @@ class Attendance(db.Model):
     status = db.Column(db.String(20), nullable=False) # Present, Absent, Leave
     in_time = db.Column(db.Time, nullable=True)
     out_time = db.Column(db.Time, nullable=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+
+    # One record per user per day; punches upsert against it.
+    __table_args__ = (db.Index('uq_attendance_user_date', 'user_id', 'date', unique=True),)
 
     def __repr__(self):
         return f"Attendance('{self.date}', '{self.status}')"
+
+class DataVersion(db.Model):
+    # Bumped whenever a user's Overtime/Attendance/User rows change; the report
+    # cache uses it as the data-version stamp. No foreign key, so the counter
+    # survives the user being deleted.
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"DataVersion('{self.user_id}', '{self.version}')"
+
+def init_db():
+    """
+    Create missing tables, plus indexes added to tables that already exist
+    (db.create_all() only creates indexes together with a new table).
+    """
+    db.create_all()
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(db.engine, checkfirst=True)
+            except Exception as e:
+                current_app.logger.error(f"Could not create index {index.name}: {e}")
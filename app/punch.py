@@ -0,0 +1,220 @@
+import atexit
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models import User, Attendance
+from app.report_cache import bump_data_version
+
+# A single clock-in/clock-out mark waiting to be written.
+# `done` is only set for punches that wait for their group commit.
+Punch = namedtuple('Punch', ['user_id', 'date', 'action', 'time', 'done'])
+
+PUNCH_ACTIONS = ('in', 'out')
+UNIQUE_INDEX = 'uq_attendance_user_date'
+
+
+class PunchBuffer:
+    """
+    Write-behind buffer for attendance punches.
+
+    Punches are queued in memory and a background thread writes them in
+    batches, one transaction per batch, upserting on (user_id, date).
+
+    PUNCH_DURABILITY controls when a punch is acknowledged:
+      'group' - the caller blocks until the batch holding its punch is committed.
+      'async' - the caller returns as soon as the punch is queued; punches still
+                in memory are lost if the process dies before the next flush.
+
+    In 'async' mode batches are written every PUNCH_FLUSH_INTERVAL seconds or
+    as soon as PUNCH_MAX_BATCH punches are waiting, whichever comes first.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pending = []
+        self._lock = threading.Lock()
+        # One flush at a time in this process; the unique index on
+        # (user_id, date) covers other processes and the attendance() view.
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._native_upsert = None
+        self.stats = {'punches': 0, 'batches': 0, 'rows_written': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('PUNCH_DURABILITY', 'group')
+        app.config.setdefault('PUNCH_FLUSH_INTERVAL', 0.5)
+        app.config.setdefault('PUNCH_MAX_BATCH', 500)
+        if app.config['PUNCH_DURABILITY'] not in ('group', 'async'):
+            raise ValueError("PUNCH_DURABILITY must be 'group' or 'async'")
+        atexit.register(self.flush)
+
+    def submit(self, user_id, action, when=None):
+        """
+        Queue a punch for `user_id`. Returns True once the punch is durable
+        according to PUNCH_DURABILITY. If a group commit times out, returns
+        False when the punch was withdrawn unsaved, or None when it is
+        already being written and will still be committed.
+        """
+        if action not in PUNCH_ACTIONS:
+            raise ValueError(f"Unknown punch action: {action}")
+        when = when or datetime.now()
+        wait = self.app.config['PUNCH_DURABILITY'] == 'group'
+        punch = Punch(user_id, when.date(), action, when.time().replace(microsecond=0),
+                      threading.Event() if wait else None)
+
+        self._ensure_worker()
+        with self._lock:
+            self._pending.append(punch)
+            full = len(self._pending) >= self.app.config['PUNCH_MAX_BATCH']
+        # Waiting callers wake the flusher straight away; punches that arrive
+        # while it is committing pile up and go out together in the next batch.
+        if full or wait:
+            self._wakeup.set()
+
+        if not wait:
+            return True
+        if punch.done.wait(self.app.config['PUNCH_WAIT_TIMEOUT']):
+            return True
+        with self._lock:
+            for i, queued in enumerate(self._pending):
+                if queued is punch:
+                    del self._pending[i]
+                    return False
+        return True if punch.done.is_set() else None
+
+    def flush(self):
+        """Write every queued punch now. Safe to call from any thread."""
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        while True:
+            with self._lock:
+                batch = self._pending[:self.app.config['PUNCH_MAX_BATCH']]
+                del self._pending[:len(batch)]
+            if not batch:
+                return
+            with self.app.app_context():
+                try:
+                    self._write_batch(batch)
+                except Exception:
+                    db.session.rollback()
+                    # Put the batch back so the next flush retries it.
+                    with self._lock:
+                        self._pending[:0] = batch
+                    raise
+                finally:
+                    db.session.remove()
+            for punch in batch:
+                if punch.done is not None:
+                    punch.done.set()
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='punch-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.app.config['PUNCH_FLUSH_INTERVAL'])
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error(f"Punch flush failed, will retry: {e}")
+                time.sleep(self.app.config['PUNCH_FLUSH_INTERVAL'])
+
+    def _write_batch(self, batch):
+        # Collapse the batch to one row per (user_id, date): the first
+        # clock-in and the last clock-out win.
+        merged = {}
+        for punch in batch:
+            row = merged.setdefault((punch.user_id, punch.date), {'in_time': None, 'out_time': None})
+            if punch.action == 'in':
+                if row['in_time'] is None:
+                    row['in_time'] = punch.time
+            else:
+                row['out_time'] = punch.time
+
+        # Drop punches for users deleted since they were queued, otherwise
+        # the foreign key would fail the whole batch on every retry.
+        user_ids = {user_id for (user_id,) in db.session.query(User.id)
+                    .filter(User.id.in_({user_id for user_id, _ in merged}))}
+        rows = [{'user_id': user_id, 'date': att_date, 'status': 'Present',
+                 'in_time': row['in_time'], 'out_time': row['out_time']}
+                for (user_id, att_date), row in merged.items() if user_id in user_ids]
+
+        # Bump versions first: ORM writes do the same in before_flush, so both
+        # paths lock data_version before attendance and can't deadlock.
+        bump_data_version(user_ids)
+        if rows:
+            if self._use_native_upsert():
+                self._upsert(rows)
+            else:
+                self._select_then_write(rows)
+        db.session.commit()
+
+        self.stats['punches'] += len(batch)
+        self.stats['batches'] += 1
+        self.stats['rows_written'] += len(rows)
+
+    def _use_native_upsert(self):
+        # ON CONFLICT needs the unique index, which init_db() cannot add while
+        # duplicate (user_id, date) rows exist.
+        if self._native_upsert is None:
+            engine = db.session.get_bind(mapper=Attendance)
+            self._native_upsert = engine.dialect.name in ('sqlite', 'postgresql') and any(
+                index['name'] == UNIQUE_INDEX for index in sa.inspect(engine).get_indexes('attendance'))
+            if not self._native_upsert:
+                self.app.logger.warning(f"Index {UNIQUE_INDEX} missing or unsupported; "
+                                        "punches fall back to SELECT then INSERT/UPDATE")
+        return self._native_upsert
+
+    def _upsert(self, rows):
+        # A punch always makes the day Present, even over an Absent/Leave record.
+        table = Attendance.__table__
+        dialect = db.session.get_bind(mapper=Attendance).dialect.name
+        stmt = (sqlite.insert if dialect == 'sqlite' else postgresql.insert)(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.date],
+            set_={
+                'status': 'Present',
+                'in_time': sa.func.coalesce(table.c.in_time, stmt.excluded.in_time),
+                'out_time': sa.func.coalesce(stmt.excluded.out_time, table.c.out_time),
+            })
+        db.session.execute(stmt, rows)
+
+    def _select_then_write(self, rows):
+        # Fallback for other dialects; not safe against a concurrent writer.
+        by_key = {(r['user_id'], r['date']): r for r in rows}
+        existing = db.session.query(Attendance.id, Attendance.user_id, Attendance.date,
+                                    Attendance.in_time, Attendance.out_time)\
+            .filter(Attendance.user_id.in_({r['user_id'] for r in rows}),
+                    Attendance.date.in_({r['date'] for r in rows})).all()
+
+        updates = []
+        for att_id, user_id, att_date, in_time, out_time in existing:
+            row = by_key.pop((user_id, att_date), None)
+            if row is None:
+                continue
+            updates.append({'id': att_id, 'status': 'Present',
+                            'in_time': in_time or row['in_time'],
+                            'out_time': row['out_time'] or out_time})
+
+        if updates:
+            db.session.execute(sa.update(Attendance), updates)
+        if by_key:
+            db.session.execute(sa.insert(Attendance), list(by_key.values()))
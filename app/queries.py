@@ -0,0 +1,53 @@
+import calendar
+from collections import namedtuple
+from datetime import date
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Overtime, Attendance
+
+# Read-only records for list and report views. They hold plain column values,
+# are never added to the session and have no relationship machinery, so
+# loading a few years of history costs a tuple per row instead of an ORM
+# instance. Use the models when a row needs to be changed or deleted.
+OvertimeRow = namedtuple('OvertimeRow', ['id', 'date', 'hours'])
+AttendanceRow = namedtuple('AttendanceRow', ['id', 'date', 'status', 'in_time', 'out_time'])
+
+
+def month_range(year, month):
+    """First and last day of a month, for index-friendly date filters."""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _rows(record, model, columns, user_id, start, end, newest_first):
+    query = select(*columns).where(model.user_id == user_id)
+    if start is not None:
+        query = query.where(model.date >= start)
+    if end is not None:
+        query = query.where(model.date <= end)
+    query = query.order_by(model.date.desc() if newest_first else model.date)
+    return list(map(record._make, db.session.execute(query).tuples()))
+
+
+def overtime_rows(user_id, start=None, end=None, newest_first=False):
+    return _rows(OvertimeRow, Overtime, (Overtime.id, Overtime.date, Overtime.hours),
+                 user_id, start, end, newest_first)
+
+
+def attendance_rows(user_id, start=None, end=None, newest_first=False):
+    columns = (Attendance.id, Attendance.date, Attendance.status, Attendance.in_time, Attendance.out_time)
+    return _rows(AttendanceRow, Attendance, columns, user_id, start, end, newest_first)
+
+
+def overtime_hours_by_user():
+    """{user_id: total OT hours} for every user with overtime."""
+    query = select(Overtime.user_id, func.sum(Overtime.hours)).group_by(Overtime.user_id)
+    return {user_id: value for user_id, value in db.session.execute(query)}
+
+
+def present_days_by_user():
+    """{user_id: number of Present days} for every user with attendance."""
+    query = select(Attendance.user_id, func.count(Attendance.id))\
+        .where(Attendance.status == 'Present').group_by(Attendance.user_id)
+    return {user_id: value for user_id, value in db.session.execute(query)}
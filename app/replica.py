@@ -0,0 +1,64 @@
+import time
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import current_app, g, has_app_context, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+
+
+def pin_to_primary():
+    """
+    Keep the current browser session reading from the primary for
+    REPLICA_PIN_SECONDS. Flushes in a request call this themselves; call it
+    directly for writes committed elsewhere, such as buffered punches.
+    """
+    if has_request_context() and REPLICA_BIND in current_app.config['SQLALCHEMY_BINDS']:
+        flask_session['primary_until'] = time.time() + current_app.config['REPLICA_PIN_SECONDS']
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to the 'replica' bind while a view decorated
+    with @read_replica is running. Flushes and INSERT/UPDATE/DELETE
+    statements always go to the primary, and so does everything when no
+    replica is configured.
+
+    A browser session that wrote something keeps reading from the primary
+    for REPLICA_PIN_SECONDS, so the page it is redirected to never shows
+    data from before its own write.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica(clause):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self, clause):
+        if not has_app_context() or REPLICA_BIND not in self._db.engines:
+            return False
+        if self._flushing or isinstance(clause, sa.UpdateBase):
+            pin_to_primary()
+            return False
+        if not g.get('use_replica'):
+            return False
+        if has_request_context() and flask_session.get('primary_until', 0) > time.time():
+            return False
+        return True
+
+
+def read_replica(f):
+    """
+    Run a read-only view against the read replica. Replicas can lag; the
+    user's own recent writes are covered by the primary pin (see
+    RoutingSession), other users' writes may show up a little late.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.use_replica = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.use_replica = False
+    return decorated_function
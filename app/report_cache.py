@@ -0,0 +1,184 @@
+import hashlib
+import itertools
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models import User, Overtime, Attendance, DataVersion
+from app.replica import RoutingSession
+
+# Bump when the layout of a cached report changes so old files are not served.
+REPORT_FORMAT = 1
+
+# User columns that never appear in a report; changing them keeps cached files valid.
+UNREPORTED_USER_FIELDS = {'password', 'last_login', 'last_ip'}
+
+# Files used in the last few seconds may still be opening in send_file(),
+# so eviction leaves them alone.
+EVICT_GRACE_SECONDS = 5
+
+
+def bump_data_version(user_ids, session=None):
+    """
+    Record that data belonging to `user_ids` changed, inside the caller's
+    transaction. Paths that write with bulk statements must call this
+    themselves; ORM flushes are tracked automatically.
+    """
+    user_ids = sorted({uid for uid in user_ids if uid is not None})
+    if not user_ids:
+        return
+    session = session or db.session
+    table = DataVersion.__table__
+    dialect = session.get_bind(clause=table.insert()).dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        stmt = insert(table).values([{'user_id': uid, 'version': 1} for uid in user_ids])
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.user_id],
+                                          set_={'version': table.c.version + 1})
+        session.execute(stmt)
+        return
+
+    session.execute(update(table).where(table.c.user_id.in_(user_ids)).values(version=table.c.version + 1))
+    existing = {uid for (uid,) in session.execute(select(table.c.user_id).where(table.c.user_id.in_(user_ids)))}
+    missing = [{'user_id': uid, 'version': 1} for uid in user_ids if uid not in existing]
+    if missing:
+        session.execute(table.insert(), missing)
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _track_changes(session, flush_context, instances):
+    user_ids = set()
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (Overtime, Attendance)):
+            user_ids.add(obj.user_id if obj.user_id is not None else getattr(obj.author, 'id', None))
+        elif isinstance(obj, User) and obj not in session.new:
+            # New users have no cached reports yet.
+            state = inspect(obj)
+            if obj in session.deleted or any(
+                    state.attrs[attr.key].history.has_changes()
+                    for attr in state.mapper.column_attrs if attr.key not in UNREPORTED_USER_FIELDS):
+                user_ids.add(obj.id)
+    bump_data_version(user_ids, session)
+
+
+def user_report_stamp(user):
+    """Changes whenever anything in `user`'s own reports could change."""
+    version = db.session.execute(select(DataVersion.version).where(DataVersion.user_id == user.id)).scalar()
+    # created_at guards against a recycled id picking up a deleted user's files
+    return f"{REPORT_FORMAT}:{user.id}:{user.created_at.isoformat()}:{version or 0}"
+
+
+def all_users_stamp():
+    """Changes whenever any user is added, changed or deleted."""
+    users, last_id = db.session.execute(select(func.count(User.id), func.max(User.id))).one()
+    versions = db.session.execute(select(func.coalesce(func.sum(DataVersion.version), 0))).scalar()
+    return f"{REPORT_FORMAT}:{users}:{last_id}:{versions}"
+
+
+class ReportCache:
+    """
+    On-disk cache for generated report files, keyed by report type, owner and
+    a data-version stamp. The least recently used files are evicted once the
+    cache grows past REPORT_CACHE_MAX_BYTES. Statistics are per process.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.directory = None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('REPORT_CACHE_DIR', None)
+        app.config.setdefault('REPORT_CACHE_MAX_BYTES', 100 * 1024 * 1024)
+        # Absolute, because send_file() resolves relative paths against app.root_path
+        self.directory = os.path.abspath(app.config['REPORT_CACHE_DIR']
+                                         or os.path.join(app.instance_path, 'report_cache'))
+
+    def get_or_build(self, kind, owner, stamp, suffix, build):
+        """
+        Path of the cached `kind` report for `owner` at `stamp`. On a miss
+        `build()` is called; it must return the file contents as bytes.
+        """
+        digest = hashlib.sha256(stamp.encode()).hexdigest()[:16]
+        prefix = f"{kind}-{owner}-"
+        path = os.path.join(self.directory, f"{prefix}{digest}{suffix}")
+
+        # Touch the file under the lock so a concurrent _evict() either runs
+        # first (a miss) or sees a fresh mtime and skips it.
+        with self._lock:
+            try:
+                os.utime(path)  # mtime doubles as the LRU clock
+                self.stats['hits'] += 1
+                return path
+            except FileNotFoundError:
+                pass
+
+        data = build()
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self.stats['misses'] += 1
+            self._evict(keep=path, stale_prefix=prefix)
+        return path
+
+    def info(self):
+        files, size = 0, 0
+        for entry in self._entries():
+            files += 1
+            size += entry.stat().st_size
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+        stats.update(files=files, bytes=size, max_bytes=self.app.config['REPORT_CACHE_MAX_BYTES'])
+        return stats
+
+    def _entries(self):
+        try:
+            return [e for e in os.scandir(self.directory) if e.is_file() and not e.name.endswith('.tmp')]
+        except FileNotFoundError:
+            return []
+
+    def _evict(self, keep, stale_prefix):
+        recent = time.time() - EVICT_GRACE_SECONDS
+        entries, total = [], os.path.getsize(keep)
+        for entry in self._entries():
+            if entry.path == keep:
+                continue
+            try:
+                st = entry.stat()
+                if st.st_mtime >= recent:
+                    total += st.st_size
+                # Older versions of the report just written can never be hit again
+                elif entry.name.startswith(stale_prefix):
+                    os.remove(entry.path)
+                    self.stats['evictions'] += 1
+                else:
+                    total += st.st_size
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+            except OSError:
+                continue
+
+        for _, size, path in sorted(entries):
+            if total <= self.app.config['REPORT_CACHE_MAX_BYTES']:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.stats['evictions'] += 1
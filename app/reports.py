@@ -0,0 +1,79 @@
+from sqlalchemy import Integer, case, cast, func, literal, literal_column, select, union_all
+
+from app import db
+from app.models import Overtime, Attendance
+
+GROUPINGS = ('day', 'week', 'month')
+
+
+def _period(column, grouping, dialect):
+    """SQL expression labelling `column` with its day/week/month bucket."""
+    if dialect == 'sqlite':
+        if grouping == 'day':
+            return func.date(column)
+        if grouping == 'week':
+            # Monday of the ISO week
+            return func.date(column, 'weekday 0', '-6 days')
+        return func.strftime('%Y-%m', column)
+    if dialect == 'postgresql':
+        if grouping == 'day':
+            return func.to_char(column, 'YYYY-MM-DD')
+        if grouping == 'week':
+            return func.to_char(func.date_trunc('week', column), 'YYYY-MM-DD')
+        return func.to_char(column, 'YYYY-MM')
+    raise NotImplementedError(f"Period grouping is not supported on {dialect}")
+
+
+def _days_in_month(column, dialect):
+    if dialect == 'sqlite':
+        return cast(func.strftime('%d', func.date(column, 'start of month', '+1 month', '-1 day')), Integer)
+    if dialect == 'postgresql':
+        return func.date_part('day', func.date_trunc('month', column) + literal_column("interval '1 month - 1 day'"))
+    raise NotImplementedError(f"Period grouping is not supported on {dialect}")
+
+
+def period_summary(user, start, end, grouping='month', session=None):
+    """
+    OT hours, OT pay, present days and earned salary for `user` between
+    `start` and `end` (inclusive), one row per day/week/month bucket.
+
+    Everything is aggregated in the database, so the result has one row per
+    bucket no matter how many records fall in the range. Earned salary uses
+    the same rule as the dashboard: monthly salary / days in that month for
+    every Present day.
+    """
+    if grouping not in GROUPINGS:
+        raise ValueError(f"grouping must be one of {', '.join(GROUPINGS)}")
+    session = session or db.session
+    dialect = session.get_bind(mapper=Overtime).dialect.name
+
+    ot_rows = select(
+        _period(Overtime.date, grouping, dialect).label('period'),
+        Overtime.hours.label('ot_hours'),
+        literal(0).label('present'),
+        literal(0.0).label('earned'),
+    ).where(Overtime.user_id == user.id, Overtime.date >= start, Overtime.date <= end)
+
+    is_present = Attendance.status == 'Present'
+    daily_salary = literal(float(user.monthly_salary or 0)) / _days_in_month(Attendance.date, dialect)
+    att_rows = select(
+        _period(Attendance.date, grouping, dialect).label('period'),
+        literal(0.0).label('ot_hours'),
+        case((is_present, 1), else_=0).label('present'),
+        case((is_present, daily_salary), else_=0.0).label('earned'),
+    ).where(Attendance.user_id == user.id, Attendance.date >= start, Attendance.date <= end)
+
+    rows = union_all(ot_rows, att_rows).subquery()
+    ot_hours = func.sum(rows.c.ot_hours)
+    earned = func.sum(rows.c.earned)
+    ot_pay = ot_hours * literal(float(user.ot_rate or 0))
+    query = select(
+        rows.c.period,
+        ot_hours.label('ot_hours'),
+        ot_pay.label('ot_pay'),
+        func.sum(rows.c.present).label('present_days'),
+        earned.label('salary_earned'),
+        (earned + ot_pay).label('total_pay'),
+    ).group_by(rows.c.period).order_by(rows.c.period)
+
+    return session.execute(query).all()
@@ -2,10 +2,14 @@ import os
 import secrets
 import calendar
 from datetime import datetime, date
-from flask import render_template, url_for, flash, redirect, request, send_file, Response
-from app import app, db, bcrypt
+from flask import render_template, url_for, flash, redirect, request, send_file, Response, jsonify
+from app import app, db, bcrypt, punch_buffer, report_cache
 from app.forms import RegistrationForm, LoginForm, UpdateAccountForm, OvertimeForm, AttendanceForm
 from app.models import User, Overtime, Attendance
+from app.reports import GROUPINGS, period_summary
+from app.replica import read_replica, pin_to_primary
+from app.queries import month_range, overtime_rows, attendance_rows, overtime_hours_by_user, present_days_by_user
+from app.report_cache import bump_data_version, user_report_stamp, all_users_stamp
 from flask_login import login_user, current_user, logout_user, login_required
 import pandas as pd
 from io import BytesIO
@@ -13,6 +17,7 @@ from fpdf import FPDF
 
 from functools import wraps
 from flask import abort
+from sqlalchemy.exc import IntegrityError
 
 def admin_required(f):
     @wraps(f)
@@ -41,8 +46,9 @@ def dashboard():
     except ValueError:
         selected_month = now.month
 
-    overtimes = Overtime.query.filter_by(user_id=current_user.id).filter(db.extract('month', Overtime.date) == selected_month, db.extract('year', Overtime.date) == current_year).all()
-    all_attendances = Attendance.query.filter_by(user_id=current_user.id).filter(db.extract('month', Attendance.date) == selected_month, db.extract('year', Attendance.date) == current_year).all()
+    start, end = month_range(current_year, selected_month)
+    overtimes = overtime_rows(current_user.id, start, end)
+    all_attendances = attendance_rows(current_user.id, start, end)
     present_attendances = [a for a in all_attendances if a.status == 'Present']
     
     total_ot_hours = sum(ot.hours for ot in overtimes)
@@ -81,13 +87,15 @@ def dashboard():
 
 @app.route("/history", methods=['GET', 'POST'])
 @login_required
+@read_replica
 def history():
     now = datetime.now()
     month = request.args.get('month', now.month, type=int)
     year = request.args.get('year', now.year, type=int)
     
-    overtimes = Overtime.query.filter_by(user_id=current_user.id).filter(db.extract('month', Overtime.date) == month, db.extract('year', Overtime.date) == year).order_by(Overtime.date).all()
-    attendances = Attendance.query.filter_by(user_id=current_user.id).filter(db.extract('month', Attendance.date) == month, db.extract('year', Attendance.date) == year).order_by(Attendance.date).all()
+    start, end = month_range(year, month)
+    overtimes = overtime_rows(current_user.id, start, end)
+    attendances = attendance_rows(current_user.id, start, end)
     
     total_ot_hours = sum(ot.hours for ot in overtimes)
     total_ot_money = total_ot_hours * current_user.ot_rate
@@ -105,9 +113,61 @@ def history():
                            total_ot_hours=total_ot_hours, total_ot_money=total_ot_money,
                            attendance_days=attendance_days, total_salary=total_salary)
 
+def _report_params():
+    today = date.today()
+    parse = lambda s: datetime.strptime(s, '%Y-%m-%d').date()
+    start = request.args.get('start', date(today.year, 1, 1), type=parse)
+    end = request.args.get('end', today, type=parse)
+    grouping = request.args.get('group', 'month')
+    if grouping not in GROUPINGS:
+        grouping = 'month'
+    if start > end:
+        start, end = end, start
+    return start, end, grouping
+
+@app.route("/report")
+@login_required
+@read_replica
+def report():
+    start, end, grouping = _report_params()
+    rows = period_summary(current_user, start, end, grouping)
+
+    totals = {
+        'ot_hours': sum(r.ot_hours for r in rows),
+        'ot_pay': sum(r.ot_pay for r in rows),
+        'present_days': sum(r.present_days for r in rows),
+        'total_pay': sum(r.total_pay for r in rows),
+    }
+    return render_template('report.html', title='Report', rows=rows, totals=totals,
+                           start=start, end=end, grouping=grouping, groupings=GROUPINGS)
+
+@app.route("/report/export_excel")
+@login_required
+@read_replica
+def export_report_excel():
+    start, end, grouping = _report_params()
+    rows = period_summary(current_user, start, end, grouping)
+
+    df = pd.DataFrame([{
+        grouping.capitalize(): r.period,
+        'OT Hours': r.ot_hours,
+        'OT Amount': r.ot_pay,
+        'Present Days': r.present_days,
+        'Salary Earned': r.salary_earned,
+        'Total Pay': r.total_pay
+    } for r in rows])
+
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name=f'By {grouping.capitalize()}', index=False)
+
+    output.seek(0)
+    return send_file(output, download_name=f'timepay_report_{start}_{end}.xlsx', as_attachment=True)
+
 @app.route("/admin_dashboard")
 @login_required
 @admin_required
+@read_replica
 def admin_dashboard():
     users = User.query.all()
     total_users = User.query.count()
@@ -165,9 +225,10 @@ def delete_user(user_id):
         flash('Cannot delete Super Admin.', 'danger')
         return redirect(url_for('admin_dashboard'))
     
-    db.session.delete(user)
+    username = user.username
+    _delete_users([user.id])
     db.session.commit()
-    flash(f'User {user.username} has been deleted.', 'success')
+    flash(f'User {username} has been deleted.', 'success')
     return redirect(url_for('admin_dashboard'))
 
 @app.route("/admin/block_user/<int:user_id>", methods=['POST'])
@@ -185,6 +246,50 @@ def block_user(user_id):
     flash(f'User {user.username} has been {status}.', 'success')
     return redirect(url_for('admin_dashboard'))
 
+def _delete_users(user_ids):
+    # Set-based delete: one DELETE per table instead of loading every
+    # Overtime/Attendance row into the session. Child rows are removed
+    # explicitly so this also works on databases created before the
+    # ON DELETE CASCADE foreign keys. The caller commits.
+    db.session.execute(db.delete(Overtime).where(Overtime.user_id.in_(user_ids)))
+    db.session.execute(db.delete(Attendance).where(Attendance.user_id.in_(user_ids)))
+    db.session.execute(db.delete(User).where(User.id.in_(user_ids)))
+    bump_data_version(user_ids)
+
+@app.route("/admin/bulk_action", methods=['POST'])
+@login_required
+@admin_required
+def bulk_user_action():
+    action = request.form.get('action')
+    user_ids = request.form.getlist('user_ids', type=int)
+    if action not in ('block', 'unblock', 'delete') or not user_ids:
+        flash('Select at least one user and an action.', 'warning')
+        return redirect(url_for('admin_dashboard'))
+
+    # Super Admins are never touched by bulk actions
+    user_ids = [uid for (uid,) in db.session.query(User.id)
+                .filter(User.id.in_(user_ids), User.role != 'super_admin')]
+    if not user_ids:
+        flash(f'No eligible users selected to {action}. Super Admins cannot be changed in bulk.', 'warning')
+        return redirect(url_for('admin_dashboard'))
+
+    try:
+        if action == 'delete':
+            _delete_users(user_ids)
+        else:
+            db.session.execute(db.update(User).where(User.id.in_(user_ids))
+                               .values(is_blocked=(action == 'block')))
+            bump_data_version(user_ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        flash('Bulk action failed. No users were changed.', 'danger')
+        return redirect(url_for('admin_dashboard'))
+
+    past = {'block': 'blocked', 'unblock': 'unblocked', 'delete': 'deleted'}[action]
+    flash(f'{len(user_ids)} user(s) have been {past}.', 'success')
+    return redirect(url_for('admin_dashboard'))
+
 @app.route("/admin/impersonate/<int:user_id>")
 @login_required
 @admin_required
@@ -301,11 +406,18 @@ def add_ot():
         if not existing_att:
             att = Attendance(date=form.date.data, status='Present', author=current_user)
             db.session.add(att)
-            flash('Overtime added & Attendance marked as Present!', 'success')
+            message = 'Overtime added & Attendance marked as Present!'
         else:
-            flash('Overtime added!', 'success')
+            message = 'Overtime added!'
             
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A punch created the attendance record in the meantime
+            db.session.rollback()
+            flash('Attendance for this date changed while saving. Please try again.', 'warning')
+            return redirect(url_for('add_ot'))
+        flash(message, 'success')
         return redirect(url_for('dashboard'))
     return render_template('add_ot.html', title='Add Overtime', form=form)
 
@@ -328,14 +440,41 @@ def attendance():
                          in_time=form.in_time.data, out_time=form.out_time.data, 
                          author=current_user)
         db.session.add(att)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash('Attendance for this date already exists. Please delete it from History to update.', 'warning')
+            return redirect(url_for('attendance'))
         flash('Attendance added!', 'success')
         return redirect(url_for('attendance'))
     
     # Show attendance history
-    attendances = Attendance.query.filter_by(user_id=current_user.id).order_by(Attendance.date.desc()).all()
+    attendances = attendance_rows(current_user.id, newest_first=True)
     return render_template('attendance.html', title='Attendance', form=form, attendances=attendances)
 
+@app.route("/punch", methods=['POST'])
+@login_required
+def punch():
+    # Lightweight clock-in/clock-out for shift-change bursts.
+    # Punches are buffered and group-committed by app.punch.PunchBuffer.
+    payload = request.get_json(silent=True) or request.form
+    action = payload.get('action')
+    if action not in ('in', 'out'):
+        return jsonify({'error': "action must be 'in' or 'out'"}), 400
+
+    saved = punch_buffer.submit(current_user.id, action)
+    if saved is False:
+        return jsonify({'error': 'Punch could not be saved. Please try again.'}), 503
+    # The punch is committed on the flusher thread, outside this request.
+    pin_to_primary()
+
+    if saved is None:
+        status = 'pending'  # timed out mid-commit; it will still be written
+    else:
+        status = 'recorded' if app.config['PUNCH_DURABILITY'] == 'group' else 'queued'
+    return jsonify({'status': status, 'action': action}), 200 if status == 'recorded' else 202
+
 @app.route("/delete_ot/<int:ot_id>", methods=['POST'])
 @login_required
 def delete_ot(ot_id):
@@ -360,9 +499,14 @@ def delete_attendance(att_id):
 
 @app.route("/export_excel")
 @login_required
+@read_replica
 def export_excel():
-    overtimes = Overtime.query.filter_by(user_id=current_user.id).all()
-    attendances = Attendance.query.filter_by(user_id=current_user.id).all()
+    path = report_cache.get_or_build('excel', current_user.id, user_report_stamp(current_user), '.xlsx', _excel_report)
+    return send_file(path, download_name='timepay_report.xlsx', as_attachment=True)
+
+def _excel_report():
+    overtimes = overtime_rows(current_user.id)
+    attendances = attendance_rows(current_user.id)
     
     # Calculate Summary Data
     total_ot_hours = sum(ot.hours for ot in overtimes)
@@ -379,10 +523,13 @@ def export_excel():
     # Combine dates
     dates = set([ot.date for ot in overtimes] + [att.date for att in attendances])
     sorted_dates = sorted(list(dates))
+    # One record per date; keep the first if there are duplicates
+    ot_by_date = {o.date: o for o in reversed(overtimes)}
+    att_by_date = {a.date: a for a in reversed(attendances)}
     
     for d in sorted_dates:
-        ot = next((o for o in overtimes if o.date == d), None)
-        att = next((a for a in attendances if a.date == d), None)
+        ot = ot_by_date.get(d)
+        att = att_by_date.get(d)
         
         ot_hours = ot.hours if ot else 0
         ot_amount = ot_hours * current_user.ot_rate
@@ -412,8 +559,7 @@ def export_excel():
     with pd.ExcelWriter(output, engine='openpyxl') as writer:
         df.to_excel(writer, sheet_name='Detailed Report', index=False)
     
-    output.seek(0)
-    return send_file(output, download_name='timepay_report.xlsx', as_attachment=True)
+    return output.getvalue()
 
 @app.route("/change_password", methods=['POST'])
 @login_required
@@ -430,9 +576,14 @@ def change_password():
 
 @app.route("/export_pdf")
 @login_required
+@read_replica
 def export_pdf():
-    overtimes = Overtime.query.filter_by(user_id=current_user.id).all()
-    attendances = Attendance.query.filter_by(user_id=current_user.id).all()
+    path = report_cache.get_or_build('pdf', current_user.id, user_report_stamp(current_user), '.pdf', _pdf_report)
+    return send_file(path, download_name='detailed_report.pdf', as_attachment=True, mimetype='application/pdf')
+
+def _pdf_report():
+    overtimes = overtime_rows(current_user.id)
+    attendances = attendance_rows(current_user.id)
     
     pdf = FPDF()
     pdf.add_page()
@@ -457,13 +608,16 @@ def export_pdf():
     
     dates = set([ot.date for ot in overtimes] + [att.date for att in attendances])
     sorted_dates = sorted(list(dates))
+    # One record per date; keep the first if there are duplicates
+    ot_by_date = {o.date: o for o in reversed(overtimes)}
+    att_by_date = {a.date: a for a in reversed(attendances)}
     
     total_ot_amt = 0
     total_salary_amt = 0
     
     for d in sorted_dates:
-        ot = next((o for o in overtimes if o.date == d), None)
-        att = next((a for a in attendances if a.date == d), None)
+        ot = ot_by_date.get(d)
+        att = att_by_date.get(d)
         
         ot_hours = ot.hours if ot else 0
         ot_amount = ot_hours * current_user.ot_rate
@@ -490,20 +644,23 @@ def export_pdf():
     pdf.cell(30, 10, "", 1)
     pdf.cell(30, 10, f"{total_salary_amt:.2f}", 1)
     
-    output = BytesIO()
     s = pdf.output(dest='S')
     if isinstance(s, str):
         s = s.encode('latin-1')
-    output.write(s)
-    output.seek(0)
-    
-    return send_file(output, download_name='detailed_report.pdf', as_attachment=True, mimetype='application/pdf')
+    return s
 
 @app.route("/admin/export_pdf")
 @login_required
 @admin_required
+@read_replica
 def admin_export_pdf():
+    path = report_cache.get_or_build('admin_pdf', 'all', all_users_stamp(), '.pdf', _admin_pdf_report)
+    return send_file(path, download_name='admin_user_report.pdf', as_attachment=True, mimetype='application/pdf')
+
+def _admin_pdf_report():
     users = User.query.all()
+    ot_hours = overtime_hours_by_user()
+    present_days = present_days_by_user()
     
     pdf = FPDF()
     pdf.add_page()
@@ -511,7 +668,9 @@ def admin_export_pdf():
     
     pdf.cell(200, 10, txt="User Summary Report", ln=1, align='C')
     pdf.set_font("Arial", size=10)
-    pdf.cell(200, 10, txt=f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}", ln=1, align='C')
+    # The file is cached until the data changes, so this is when the data was
+    # read, not when the PDF was downloaded.
+    pdf.cell(200, 10, txt=f"Data as of: {datetime.now().strftime('%Y-%m-%d %H:%M')}", ln=1, align='C')
     pdf.ln(10)
     
     # Table Header
@@ -528,8 +687,8 @@ def admin_export_pdf():
     pdf.set_font("Arial", size=9)
     
     for user in users:
-        total_ot = sum(ot.hours for ot in user.overtimes)
-        total_att = len([a for a in user.attendances if a.status == 'Present'])
+        total_ot = ot_hours.get(user.id, 0)
+        total_att = present_days.get(user.id, 0)
         
         pdf.cell(35, 10, user.username, 1)
         pdf.cell(45, 10, user.email, 1)
@@ -540,14 +699,16 @@ def admin_export_pdf():
         pdf.cell(25, 10, f"{total_att} Days", 1)
         pdf.ln()
         
-    output = BytesIO()
     s = pdf.output(dest='S')
     if isinstance(s, str):
         s = s.encode('latin-1')
-    output.write(s)
-    output.seek(0)
-    
-    return send_file(output, download_name='admin_user_report.pdf', as_attachment=True, mimetype='application/pdf')
+    return s
+
+@app.route("/admin/report_cache")
+@login_required
+@admin_required
+def report_cache_stats():
+    return jsonify(report_cache.info())
 
 @app.after_request
 def add_security_headers(response):
@@ -0,0 +1,24 @@
+"""
+Throwaway database for the benchmarks. Import this before `app`: it points
+DATABASE_URL at BENCH_DATABASE_URL, or at a temporary SQLite file, and
+turns the read replica off.
+"""
+import os
+import sys
+import tempfile
+
+# Every table is dropped and recreated, so never fall back to DATABASE_URL.
+_tmpdir = tempfile.mkdtemp(prefix='timepay-bench-')
+os.environ['DATABASE_URL'] = os.environ.get('BENCH_DATABASE_URL') or 'sqlite:///' + os.path.join(_tmpdir, 'bench.db')
+os.environ.pop('REPLICA_DATABASE_URL', None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def refuse_populated_db():
+    """Exit unless the database is empty; call once, inside an app context."""
+    from app import db
+    from app.models import User
+
+    # Last line of defence against pointing BENCH_DATABASE_URL at real data
+    if db.inspect(db.engine).has_table('user') and User.query.first() is not None:
+        sys.exit(f"Refusing to wipe {db.engine.url!r}: the user table already has rows.")
@@ -0,0 +1,97 @@
+"""
+ORM instances vs read-only row projections for list and report views.
+
+Loads the same Attendance rows through `Attendance.query...all()` and
+through `app.queries.attendance_rows()`, and reports time and peak Python
+memory per 100k rows. Runs against a throwaway SQLite file unless
+BENCH_DATABASE_URL is set.
+
+    python -m benchmarks.projections --rows 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import date, datetime, time as clock, timedelta
+
+from benchmarks._db import refuse_populated_db  # must come before the app import
+
+from app import app, db
+from app.models import User, Attendance
+from app.queries import attendance_rows
+
+
+def seed(n_rows):
+    db.drop_all()
+    db.create_all()
+    db.session.execute(db.insert(User), [{
+        'username': 'bench', 'email': 'bench@example.com', 'password': 'x',
+        'monthly_salary': 30000, 'ot_rate': 100, 'role': 'user', 'created_at': datetime.utcnow()
+    }])
+    user_id = db.session.query(User.id).scalar()
+    first = date(2000, 1, 1)
+    db.session.execute(db.insert(Attendance), [
+        {'user_id': user_id, 'date': first + timedelta(days=i), 'status': 'Present',
+         'in_time': clock(9, 0), 'out_time': clock(18, 0)}
+        for i in range(n_rows)
+    ])
+    db.session.commit()
+    return user_id
+
+
+def orm_path(user_id):
+    return Attendance.query.filter_by(user_id=user_id).order_by(Attendance.date).all()
+
+
+def projection_path(user_id):
+    return attendance_rows(user_id)
+
+
+def run(load, user_id):
+    rows = load(user_id)
+    # Touch the columns a template would read
+    for r in rows:
+        (r.date, r.status, r.in_time, r.out_time)
+    return len(rows)
+
+
+def measure(load, user_id, repeat):
+    # Time and memory come from separate runs: tracemalloc slows allocation down.
+    best_time = None
+    for _ in range(repeat):
+        db.session.remove()
+        gc.collect()
+        start = time.perf_counter()
+        count = run(load, user_id)
+        elapsed = time.perf_counter() - start
+        best_time = elapsed if best_time is None else min(best_time, elapsed)
+
+    db.session.remove()
+    gc.collect()
+    tracemalloc.start()
+    run(load, user_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.remove()
+    return count, best_time, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with app.app_context():
+        print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+        refuse_populated_db()
+        user_id = seed(args.rows)
+        per = 100000 / args.rows
+        for name, load in (('ORM instances', orm_path), ('row projections', projection_path)):
+            count, elapsed, peak = measure(load, user_id, args.repeat)
+            print(f"{name:16s} {count} rows: {elapsed * per:.3f}s and "
+                  f"{peak * per / 1024 / 1024:.1f} MiB peak per 100k rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Shift-change burst benchmark for attendance punches.
+
+Compares the per-request path used by `attendance()` (duplicate-check SELECT,
+INSERT and commit for every mark) against the write-behind PunchBuffer.
+Runs against a throwaway SQLite file unless BENCH_DATABASE_URL is set.
+
+    python -m benchmarks.punch_burst --users 2000 --threads 32
+"""
+import argparse
+import threading
+import time
+from datetime import datetime
+
+from benchmarks._db import refuse_populated_db  # must come before the app import
+
+from app import app, db, punch_buffer
+from app.models import User, Attendance
+
+
+def reset_db(n_users):
+    db.drop_all()
+    db.create_all()
+    db.session.execute(db.insert(User), [
+        {'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password': 'x',
+         'employee_id': f'B{i:05d}', 'monthly_salary': 30000, 'ot_rate': 100,
+         'role': 'user', 'created_at': datetime.utcnow()}
+        for i in range(n_users)
+    ])
+    db.session.commit()
+    return [row[0] for row in db.session.query(User.id).all()]
+
+
+def per_request(user_id):
+    # Mirrors the body of the attendance() view.
+    with app.app_context():
+        now = datetime.now()
+        existing = Attendance.query.filter_by(user_id=user_id, date=now.date()).first()
+        if not existing:
+            db.session.add(Attendance(date=now.date(), status='Present', in_time=now.time(), user_id=user_id))
+            db.session.commit()
+
+
+def buffered(user_id):
+    punch_buffer.submit(user_id, 'in')
+
+
+def burst(target, user_ids, n_threads):
+    chunks = [user_ids[i::n_threads] for i in range(n_threads)]
+
+    def worker(chunk):
+        for user_id in chunk:
+            target(user_id)
+
+    threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    punch_buffer.flush()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    with app.app_context():
+        refuse_populated_db()
+    print(f"Punch durability: {app.config['PUNCH_DURABILITY']}, "
+          f"flush interval: {app.config['PUNCH_FLUSH_INTERVAL']}s, "
+          f"max batch: {app.config['PUNCH_MAX_BATCH']}")
+
+    for name, target in (('per-request commit', per_request), ('write-behind buffer', buffered)):
+        with app.app_context():
+            user_ids = reset_db(args.users)
+        elapsed = burst(target, user_ids, args.threads)
+        with app.app_context():
+            rows = Attendance.query.count()
+        print(f"{name:22s} {args.users} punches in {elapsed:.2f}s "
+              f"({args.users / elapsed:.0f}/s), {rows} rows written")
+
+    print(f"Buffer stats: {punch_buffer.stats}")
+
+
+if __name__ == '__main__':
+    main()
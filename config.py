@@ -4,3 +4,30 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess-this-secret-key'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///site.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Optional read replica for report and analytics views (see app/replica.py).
+    # Without it every query goes to SQLALCHEMY_DATABASE_URI.
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+    SQLALCHEMY_BINDS = {'replica': REPLICA_DATABASE_URL} if REPLICA_DATABASE_URL else {}
+    # After a write, that browser session reads from the primary for this long.
+    REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS') or 30)
+
+    # Write-behind punch buffer (see app/punch.py).
+    # 'group' acknowledges a punch once its batch is committed, 'async' on enqueue.
+    # The flush interval bounds how long an 'async' punch stays in memory.
+    PUNCH_DURABILITY = os.environ.get('PUNCH_DURABILITY') or 'group'
+    PUNCH_FLUSH_INTERVAL = float(os.environ.get('PUNCH_FLUSH_INTERVAL') or 0.5)
+    PUNCH_MAX_BATCH = int(os.environ.get('PUNCH_MAX_BATCH') or 500)
+    # How long a 'group' punch waits for its commit before reporting failure.
+    PUNCH_WAIT_TIMEOUT = float(os.environ.get('PUNCH_WAIT_TIMEOUT') or 10.0)
+
+    # Response compression (see app/assets.py). Brotli is used when installed
+    # and accepted by the browser, gzip otherwise.
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 500)
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 5
+
+    # Generated PDF/Excel reports are cached on disk (see app/report_cache.py).
+    # Defaults to instance/report_cache.
+    REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR')
+    REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES') or 100 * 1024 * 1024)
@@ -1,10 +1,10 @@
 import os
 from app import app, db, bcrypt
-from app.models import User
+from app.models import User, init_db
 
 def create_admin():
     with app.app_context():
-        db.create_all() # Ensure tables exist with new schema
+        init_db() # Ensure tables and indexes exist with new schema
         
         admin_email = os.environ.get('ADMIN_EMAIL', 'admin@timepay.com')
         admin_password = os.environ.get('ADMIN_PASSWORD', 'admin123')
@@ -1,4 +1,5 @@
 from app import app, db
+from app.models import init_db
 import os
 
 import threading
@@ -42,12 +43,24 @@ def keep_alive():
         
         time.sleep(30)
 
+# gunicorn imports run:app without running __main__, so create missing tables
+# and indexes here; the version bumps and report cache need data_version.
+with app.app_context():
+    try:
+        init_db()
+    except Exception as e:
+        app.logger.error(f"Database initialization failed: {e}")
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create missing tables and indexes (for deployments started by gunicorn)."""
+    init_db()
+    print("Database initialized.")
+
 if __name__ == '__main__':
     # Start the keep-alive thread
     # We use a daemon thread so it dies when the main thread dies
     threading.Thread(target=keep_alive, daemon=True).start()
 
-    with app.app_context():
-        db.create_all()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=True)